@@ -36,13 +36,21 @@ void update_leds(int count){
 
 void loop() {
   String command = serialInput();
+
+  /// Optional "#[tag]" suffix is echoed back in the ack: C3#42 -> OK#42
+  String tag = "";
+  int tag_pos = command.indexOf('#');
+  if(tag_pos >= 0){
+    tag = command.substring(tag_pos);
+    command = command.substring(0, tag_pos);
+  }
   
   if(command.startsWith("C") && command.length() >= 2){ /// C + [Number]
     int finger_count = command.substring(1).toInt();
 
     if(finger_count >= 0 && finger_count <= LED_COUNT){ /// Valid command
       update_leds(finger_count);
-      Serial.print("OK\n");
+      Serial.print("OK" + tag + "\n");
     }else{ /// Invalid command
       Serial.print("ERROR");
     }
@@ -3,9 +3,137 @@ comms_module.py - Serial communication for Gest-LED
 Author: Engineer D
 """
 
+import bisect
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
 import serial
 import serial.tools.list_ports
 
+# Upper bounds (ms) of the round-trip time histogram buckets. The last
+# bucket catches everything slower than RTT_BUCKETS_MS[-1].
+RTT_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class LinkStats:
+    """Cheap, always-on health counters for one serial link."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Zero every counter (reconnect count included)."""
+        with self._lock:
+            self.commands = 0
+            self.acks = 0
+            self.timeouts = 0
+            self.stale_acks = 0
+            self.errors = 0
+            self.bytes_out = 0
+            self.bytes_in = 0
+            self.reconnects = 0
+            self.rtt_hist = [0] * (len(RTT_BUCKETS_MS) + 1)
+            self.rtt_sum_ms = 0.0
+            self.rtt_max_ms = 0.0
+            self.started = time.time()
+
+    def record_write(self, n_bytes):
+        with self._lock:
+            self.commands += 1
+            self.bytes_out += n_bytes
+
+    def record_reply(self, reply, n_bytes, rtt_ms):
+        """Classify a reply line: OK -> ack, ERROR -> error, empty -> timeout."""
+        with self._lock:
+            self.bytes_in += n_bytes
+            if reply.startswith("OK"):
+                self.acks += 1
+                self.rtt_hist[bisect.bisect_left(RTT_BUCKETS_MS, rtt_ms)] += 1
+                self.rtt_sum_ms += rtt_ms
+                self.rtt_max_ms = max(self.rtt_max_ms, rtt_ms)
+            elif reply.startswith("ERROR"):
+                self.errors += 1
+            else:
+                self.timeouts += 1
+
+    def record_stale_ack(self, n_bytes):
+        """An ack whose tag belongs to an earlier, already failed command."""
+        with self._lock:
+            self.bytes_in += n_bytes
+            self.stale_acks += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_reconnect(self):
+        with self._lock:
+            self.reconnects += 1
+
+    def snapshot(self):
+        """Return a plain dict copy of the counters, safe to serialize."""
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "commands": self.commands,
+                "acks": self.acks,
+                "timeouts": self.timeouts,
+                "stale_acks": self.stale_acks,
+                "errors": self.errors,
+                "ack_loss": round(1 - self.acks / self.commands, 4) if self.commands else 0.0,
+                "bytes_out": self.bytes_out,
+                "bytes_in": self.bytes_in,
+                "bytes_out_per_s": round(self.bytes_out / elapsed, 1),
+                "bytes_in_per_s": round(self.bytes_in / elapsed, 1),
+                "reconnects": self.reconnects,
+                "rtt_mean_ms": round(self.rtt_sum_ms / self.acks, 3) if self.acks else None,
+                "rtt_max_ms": round(self.rtt_max_ms, 3),
+                "rtt_buckets_ms": RTT_BUCKETS_MS + ["inf"],
+                "rtt_hist": list(self.rtt_hist),
+            }
+
+    def start_periodic_dump(self, path, interval=10.0):
+        """Write snapshot() as JSON to `path` every `interval` seconds."""
+        if self._dump_thread is not None:
+            return
+        self._dump_stop.clear()
+
+        def _loop():
+            while not self._dump_stop.wait(interval):
+                self.write_snapshot(path)
+
+        self._dump_thread = threading.Thread(target=_loop, daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def write_snapshot(self, path):
+        try:
+            with open(path, "w") as f:
+                json.dump(self.snapshot(), f, indent=2)
+        except OSError as e:
+            print(f"Could not write link stats to {path}: {e}")
+
+
+def get_link_stats(serial_conn):
+    """Return the LinkStats attached to a connection, creating it if missing."""
+    stats = getattr(serial_conn, "link_stats", None)
+    if stats is None:
+        stats = LinkStats()
+        serial_conn.link_stats = stats
+    return stats
+
 
 def find_esp_port():
     """Scans available serial ports and finds the ESP8266."""
@@ -22,6 +150,19 @@ def find_esp_port():
     return -1
 
 
+def find_esp_ports(baud_rate=115200):
+    """
+    Handshakes every available serial port in parallel and returns the list
+    of open serial objects that answered READY (empty list if none).
+    """
+    ports = [device.device for device in serial.tools.list_ports.comports()]
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        results = pool.map(lambda port: initialize_connection(port, baud_rate), ports)
+    return [conn for conn in results if conn is not None]
+
+
 def initialize_connection(port, baud_rate=115200, timeout=2):
     """Establishes connection and performs handshake."""
     # Implementation: Open port, send "HELLO\n",
@@ -36,6 +177,7 @@ def initialize_connection(port, baud_rate=115200, timeout=2):
         received_data = ser.readline().decode(errors="ignore").strip()
         print(f"Got: '{received_data}'")
         if received_data == "READY":
+            get_link_stats(ser)     # attach health counters
             return ser              # return serial object
         
     except serial.SerialTimeoutException:
@@ -58,23 +200,64 @@ def connect_to_esp(port=None, baud_rate=115200):
             return None
     return initialize_connection(port, baud_rate)
 
-def send_command(serial_conn, finger_count):
+def reconnect(serial_conn):
+    """
+    Re-open and re-handshake the same port, keeping the link statistics.
+    Returns the new serial object, or None on failure.
+    """
+    stats = get_link_stats(serial_conn)
+    port, baud_rate = serial_conn.port, serial_conn.baudrate
+    close_connection(serial_conn)
+    new_conn = initialize_connection(port, baud_rate)
+    if new_conn is not None:
+        new_conn.link_stats = stats
+        stats.record_reconnect()
+    return new_conn
+
+def send_command(serial_conn, finger_count, tag=None):
     """Sends a finger count command and waits for acknowledgment."""
     # Implementation: Format command "C[count]\n", send it.
     # Read response. Return True if "OK\n" is received, False otherwise.
+    # With a tag the command becomes "C[count]#[tag]\n" and the firmware
+    # answers "OK#[tag]\n", so the ack can be matched to the frame that caused it.
 
-    message = f"C{finger_count}\n"
+    if tag is None:
+        message = f"C{finger_count}\n".encode()
+        expected = ("OK",)
+    else:
+        message = f"C{finger_count}#{tag}\n".encode()
+        expected = (f"OK#{tag}", "OK")  # plain "OK" from older firmware
+    if serial_conn is None:
+        print("Error: no serial connection")
+        return False
+    stats = get_link_stats(serial_conn)
 
     try:
-        serial_conn.write(message.encode())
+        stats.record_write(len(message))
+        start = time.perf_counter()
+        serial_conn.write(message)
         serial_conn.flush()
-        print(f"Command Sent: {message.strip()}")
-        received_data = serial_conn.readline().decode(errors="ignore").strip()
-        print(f"Got: '{received_data}'")
-        if received_data == "OK":
+        print(f"Command Sent: {message.decode().strip()}")
+        deadline = start + (serial_conn.timeout or 2)
+        while True:
+            raw = serial_conn.readline()
+            rtt_ms = (time.perf_counter() - start) * 1000
+            received_data = raw.decode(errors="ignore").strip()
+            if tag is None or not received_data.startswith("OK#") or received_data == expected[0]:
+                break
+            # Late ack for an earlier command that already timed out: skip it
+            stats.record_stale_ack(len(raw))
+            print(f"Discarded stale ack '{received_data}'")
+            if time.perf_counter() >= deadline:
+                stats.record_timeout()
+                return False
+        stats.record_reply(received_data, len(raw), rtt_ms)
+        print(f"Got: '{received_data}' ({rtt_ms:.1f} ms)")
+        if received_data in expected:
             return True
 
     except serial.SerialTimeoutException:
+        stats.record_timeout()
         print("Write timeout")
     except Exception as e:
         print(f"Error: {e}")
@@ -85,12 +268,127 @@ def close_connection(serial_conn):
     """Close the serial connection if open."""
     if serial_conn and serial_conn.is_open:
         serial_conn.close()
-        
-        
+
+
+
+class _Board:
+    """One ESP in a MultiESPSink, with its own sender thread."""
+
+    def __init__(self, serial_conn):
+        self.conn = serial_conn
+        self.port = serial_conn.port
+        self.pending = None        # latest (finger_count, tag) not yet sent
+        self.cond = threading.Condition()
+        self.isolated = False
+        self.consecutive_failures = 0
+        self.last_ack_tag = None
+        self.last_ack_time = None
+        self.thread = None
+
+
+class MultiESPSink:
+    """
+    Mirrors every count update onto several ESP boards in parallel.
+
+    Each board has its own sender thread holding only the latest pending
+    update, so a slow board skips stale values instead of delaying the others.
+    A board that fails `max_failures` commands in a row is isolated and
+    reconnected in the background every `retry_interval` seconds.
+    """
+
+    def __init__(self, connections, max_failures=3, retry_interval=5.0, on_ack=None):
+        self.max_failures = max_failures
+        self.retry_interval = retry_interval
+        self.on_ack = on_ack       # called as on_ack(port, finger_count, tag) from sender threads
+        self.running = True
+        self.latest = None         # last (finger_count, tag) passed to send()
+        self.boards = [_Board(conn) for conn in connections]
+        for board in self.boards:
+            board.thread = threading.Thread(target=self._sender, args=(board,), daemon=True)
+            board.thread.start()
+
+    def send(self, finger_count, tag=None):
+        """Queue an update for every live board without waiting. Returns how many were queued."""
+        self.latest = (finger_count, tag)
+        queued = 0
+        for board in self.boards:
+            with board.cond:
+                if board.isolated:
+                    continue
+                board.pending = (finger_count, tag)
+                board.cond.notify()
+            queued += 1
+        return queued
+
+    def _sender(self, board):
+        while self.running:
+            with board.cond:
+                while self.running and (board.pending is None or board.isolated):
+                    # An isolated board wakes up periodically to try a reconnect
+                    if not board.cond.wait(self.retry_interval if board.isolated else None) \
+                            and board.isolated:
+                        break
+                if not self.running:
+                    return
+                update, board.pending = board.pending, None
+
+            if board.isolated:
+                self._try_rejoin(board)
+                continue
+
+            finger_count, tag = update
+            if send_command(board.conn, finger_count, tag=tag):
+                board.consecutive_failures = 0
+                board.last_ack_tag = tag
+                board.last_ack_time = time.time()
+                if self.on_ack:
+                    self.on_ack(board.port, finger_count, tag)
+            else:
+                board.consecutive_failures += 1
+                if board.consecutive_failures >= self.max_failures:
+                    print(f"Board on {board.port} isolated after {board.consecutive_failures} failures")
+                    with board.cond:
+                        board.isolated = True
+
+    def _try_rejoin(self, board):
+        new_conn = reconnect(board.conn)
+        if new_conn is None:
+            return
+        print(f"Board on {board.port} reconnected")
+        with board.cond:
+            board.conn = new_conn
+            board.consecutive_failures = 0
+            board.isolated = False
+            # Bring the panel up to date; updates sent while it was isolated were skipped
+            board.pending = self.latest
+
+    def status(self):
+        """Per-board health: isolation state, last ack and link statistics."""
+        return [{
+            "port": board.port,
+            "isolated": board.isolated,
+            "consecutive_failures": board.consecutive_failures,
+            "last_ack_tag": board.last_ack_tag,
+            "last_ack_time": board.last_ack_time,
+            "link": get_link_stats(board.conn).snapshot(),
+        } for board in self.boards]
+
+    def close(self):
+        """Stop the sender threads and close every board."""
+        self.running = False
+        for board in self.boards:
+            with board.cond:
+                board.cond.notify()
+        for board in self.boards:
+            board.thread.join(timeout=3)
+            close_connection(board.conn)
+
+
 if __name__ == "__main__":
     esp_port = find_esp_port()
     esp_obj = initialize_connection(esp_port)
     
     send_command(esp_obj, 1)
+    print(get_link_stats(esp_obj).snapshot())
 
 
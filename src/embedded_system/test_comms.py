@@ -24,6 +24,8 @@ if __name__ == "__main__":
         else:
             print("Sent value Failed:", 9)
 
+        print("---------------------------------")
+        print("Link stats:", comms_module.get_link_stats(my_esp).snapshot())
         comms_module.close_connection(my_esp)
     else:
         print("NO ESP Found")
@@ -0,0 +1,113 @@
+"""
+test_comms_protocol.py - Hardware-free tests for the serial command protocol
+"""
+
+import serial
+
+import comms_module
+
+
+class FakeSerial:
+    """Stands in for serial.Serial: records writes and replays canned reply lines."""
+
+    def __init__(self, replies=(), port="FAKE", timeout=0.05, write_error=None):
+        self.replies = list(replies)
+        self.port = port
+        self.baudrate = 115200
+        self.timeout = timeout
+        self.write_error = write_error
+        self.written = []
+        self.is_open = True
+
+    def write(self, data):
+        if self.write_error:
+            raise self.write_error
+        self.written.append(data)
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        # An empty read is what pyserial returns when the timeout runs out
+        return self.replies.pop(0) if self.replies else b""
+
+    def close(self):
+        self.is_open = False
+
+
+def test_tagged_ack_matches():
+    conn = FakeSerial([b"OK#42\n"])
+    assert comms_module.send_command(conn, 3, tag=42)
+    assert conn.written == [b"C3#42\n"]
+    stats = comms_module.get_link_stats(conn).snapshot()
+    assert stats["acks"] == 1 and sum(stats["rtt_hist"]) == 1
+    print("✓ Tagged ack test passed")
+
+
+def test_stale_ack_is_skipped():
+    conn = FakeSerial([b"OK#41\n", b"OK#42\n", b"OK#43\n"])
+    assert comms_module.send_command(conn, 3, tag=42)
+    # The next command must see its own ack, not one left over in the buffer
+    assert comms_module.send_command(conn, 4, tag=43)
+    stats = comms_module.get_link_stats(conn).snapshot()
+    assert stats["stale_acks"] == 1
+    assert stats["acks"] == 2 and sum(stats["rtt_hist"]) == 2
+    print("✓ Stale ack test passed")
+
+
+def test_plain_ok_from_older_firmware():
+    conn = FakeSerial([b"OK\n"])
+    assert comms_module.send_command(conn, 2, tag=7)
+    conn = FakeSerial([b"OK\n"])
+    assert comms_module.send_command(conn, 2)
+    assert conn.written == [b"C2\n"]
+    print("✓ Plain OK test passed")
+
+
+def test_error_reply():
+    conn = FakeSerial([b"ERROR"])
+    assert not comms_module.send_command(conn, 9, tag=1)
+    stats = comms_module.get_link_stats(conn).snapshot()
+    assert stats["errors"] == 1 and stats["acks"] == 0
+    print("✓ ERROR reply test passed")
+
+
+def test_read_timeout():
+    conn = FakeSerial([])
+    assert not comms_module.send_command(conn, 1, tag=5)
+    stats = comms_module.get_link_stats(conn).snapshot()
+    assert stats["timeouts"] == 1 and stats["ack_loss"] == 1.0
+    print("✓ Read timeout test passed")
+
+
+def test_stale_ack_then_timeout():
+    conn = FakeSerial([b"OK#4\n"])
+    assert not comms_module.send_command(conn, 1, tag=5)
+    stats = comms_module.get_link_stats(conn).snapshot()
+    assert stats["stale_acks"] == 1 and stats["timeouts"] == 1 and stats["acks"] == 0
+    print("✓ Stale ack then timeout test passed")
+
+
+def test_write_timeout():
+    conn = FakeSerial(write_error=serial.SerialTimeoutException("write timeout"))
+    assert not comms_module.send_command(conn, 1)
+    assert comms_module.get_link_stats(conn).snapshot()["timeouts"] == 1
+    print("✓ Write timeout test passed")
+
+
+def test_none_connection():
+    assert comms_module.send_command(None, 1) is False
+    assert comms_module.send_command(None, 1, tag=3) is False
+    print("✓ None connection test passed")
+
+
+if __name__ == "__main__":
+    test_tagged_ack_matches()
+    test_stale_ack_is_skipped()
+    test_plain_ok_from_older_firmware()
+    test_error_reply()
+    test_read_timeout()
+    test_stale_ack_then_timeout()
+    test_write_timeout()
+    test_none_connection()
+    print("\nAll protocol tests passed!")
@@ -0,0 +1,140 @@
+"""
+test_multi_sink.py - Hardware-free tests for mirroring counts onto several boards
+"""
+
+import threading
+import time
+
+import comms_module
+from comms_module import MultiESPSink
+
+
+class FakeBoard:
+    """Stands in for an ESP on serial.Serial: acks every tagged command unless dead."""
+
+    def __init__(self, port, dead=False, gate=None):
+        self.port = port
+        self.baudrate = 115200
+        self.timeout = 0.05
+        self.dead = dead
+        self.gate = gate          # threading.Event the board waits on before replying
+        self.written = []
+        self.is_open = True
+
+    def write(self, data):
+        self.written.append(data.decode().strip())
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.dead:
+            return b""
+        tag = self.written[-1].split("#")[1]
+        return f"OK#{tag}\n".encode()
+
+    def close(self):
+        self.is_open = False
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+def test_every_board_gets_the_update():
+    boards = [FakeBoard("A"), FakeBoard("B")]
+    acks = []
+    sink = MultiESPSink(boards, on_ack=lambda port, count, tag: acks.append((port, count, tag)))
+    try:
+        assert sink.send(3, tag=1) == 2
+        _wait_for(lambda: len(acks) == 2)
+    finally:
+        sink.close()
+    assert sorted(acks) == [("A", 3, 1), ("B", 3, 1)]
+    assert all(board.written == ["C3#1"] for board in boards)
+    assert not any(board.is_open for board in boards)
+    print("✓ Mirror test passed")
+
+
+def test_slow_board_skips_stale_values():
+    gate = threading.Event()
+    fast, slow = FakeBoard("FAST"), FakeBoard("SLOW", gate=gate)
+    sink = MultiESPSink([fast, slow])
+    try:
+        sink.send(0, tag=0)
+        _wait_for(lambda: slow.written == ["C0#0"])
+        for count in range(1, 6):
+            sink.send(count, tag=count)
+        # The fast board is not held back while the slow one is stuck
+        _wait_for(lambda: fast.written[-1:] == ["C5#5"])
+        assert slow.written == ["C0#0"]
+        gate.set()
+        _wait_for(lambda: slow.written[-1:] == ["C5#5"])
+        time.sleep(0.1)
+    finally:
+        gate.set()
+        sink.close()
+    # Only the latest value is kept for a busy board
+    assert slow.written == ["C0#0", "C5#5"]
+    print("✓ Slow board test passed")
+
+
+def test_dead_board_is_isolated():
+    good, dead = FakeBoard("GOOD"), FakeBoard("DEAD", dead=True)
+    sink = MultiESPSink([good, dead], max_failures=2, retry_interval=60)
+    try:
+        for count in range(2):
+            sink.send(count, tag=count)
+            _wait_for(lambda: len(dead.written) == count + 1)
+        _wait_for(lambda: sink.status()[1]["isolated"])
+        written = len(dead.written)
+        assert sink.send(7, tag=7) == 1
+        _wait_for(lambda: good.written[-1:] == ["C7#7"])
+        assert len(dead.written) == written
+        status = {board["port"]: board for board in sink.status()}
+        assert not status["GOOD"]["isolated"] and status["GOOD"]["last_ack_tag"] == 7
+        assert status["DEAD"]["consecutive_failures"] == 2
+    finally:
+        sink.close()
+    print("✓ Dead board isolation test passed")
+
+
+def test_rejoined_board_gets_latest_count():
+    dead = FakeBoard("FLAKY", dead=True)
+    replacement = FakeBoard("FLAKY")
+    handshake_ok = threading.Event()
+    original = comms_module.initialize_connection
+    comms_module.initialize_connection = \
+        lambda port, baud_rate=115200, timeout=2: replacement if handshake_ok.is_set() else None
+    sink = MultiESPSink([dead], max_failures=1, retry_interval=0.05)
+    try:
+        sink.send(1, tag=1)
+        _wait_for(lambda: sink.status()[0]["isolated"])
+        # Updates while isolated are skipped, but the latest one is remembered
+        assert sink.send(2, tag=2) == 0
+        assert sink.send(4, tag=4) == 0
+        handshake_ok.set()
+        _wait_for(lambda: replacement.written == ["C4#4"])
+        status = sink.status()[0]
+        assert not status["isolated"] and status["last_ack_tag"] == 4
+        # The rejoined board keeps the statistics of the old connection
+        assert status["link"]["reconnects"] == 1 and status["link"]["commands"] == 2
+        assert not dead.is_open
+    finally:
+        sink.close()
+        comms_module.initialize_connection = original
+    print("✓ Rejoin test passed")
+
+
+if __name__ == "__main__":
+    test_every_board_gets_the_update()
+    test_slow_board_skips_stale_values()
+    test_dead_board_is_isolated()
+    test_rejoined_board_gets_latest_count()
+    print("\nAll multi-board tests passed!")
@@ -0,0 +1,161 @@
+"""
+batch_annotate.py - Offline finger counting for recorded videos
+
+Runs the vision_module detection and counting pipeline over every video in a
+directory, one video per worker process, each worker with its own detector.
+Frames are decoded and processed one at a time and never kept; the only
+per-frame memory is the result columns, about 30 bytes a frame in numpy arrays
+sized from the container's frame count. Results for <name>.<ext> are written
+to <name>.<ext>.npz, a compressed file with one column per field:
+
+    frame        frame index in the video
+    pos_ms       decoder timestamp of the frame
+    hand         True if a hand was detected
+    count        raised finger count (0 when no hand)
+    thumb .. pinky  per-finger raised status
+    detect_ms    time spent in hand detection
+    count_ms     time spent in finger counting
+
+Usage:
+    python batch_annotate.py recordings/ --out annotations/ --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+import vision_module
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm')
+
+FINGERS = list(vision_module.FINGER_TIPS)
+
+COLUMNS = ['frame', 'pos_ms', 'hand', 'count', *FINGERS, 'detect_ms', 'count_ms']
+COLUMN_DTYPES = {'frame': np.int32, 'pos_ms': np.float64, 'hand': np.bool_, 'count': np.int8,
+                 'detect_ms': np.float32, 'count_ms': np.float32}  # fingers: bool
+
+# Per-process detector, created once by the pool initializer
+_detector = None
+
+
+def _init_worker(detection_confidence, max_hands):
+    global _detector
+    _detector = vision_module.initialize_detector(detection_confidence=detection_confidence,
+                                                  max_hands=max_hands)
+
+
+def annotate_video(video_path, out_path, flip_horizontal=False):
+    """Count fingers on every frame of one video and save the columns to out_path."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video '{video_path}'")
+
+    # Preallocate from the container's frame count (often approximate) and grow if needed
+    capacity = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0) + 1
+    columns = {name: np.zeros(capacity, dtype=COLUMN_DTYPES.get(name, np.bool_))
+               for name in COLUMNS}
+    start = time.perf_counter()
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if flip_horizontal:
+                frame = cv2.flip(frame, 1)
+
+            t0 = time.perf_counter()
+            hands, _ = vision_module.process_frame(frame, _detector, draw=False)
+            t1 = time.perf_counter()
+            status = dict.fromkeys(FINGERS, False)
+            if hands:
+                try:
+                    status = vision_module.get_finger_status(hands[0])
+                except (ValueError, IndexError):
+                    pass
+            t2 = time.perf_counter()
+
+            if index == capacity:
+                capacity *= 2
+                for name, values in columns.items():
+                    columns[name] = np.resize(values, capacity)
+            columns['frame'][index] = index
+            columns['pos_ms'][index] = pos_ms
+            columns['hand'][index] = bool(hands)
+            columns['count'][index] = sum(status.values())
+            for finger in FINGERS:
+                columns[finger][index] = status[finger]
+            columns['detect_ms'][index] = (t1 - t0) * 1000
+            columns['count_ms'][index] = (t2 - t1) * 1000
+            index += 1
+    finally:
+        cap.release()
+    elapsed = time.perf_counter() - start
+
+    # Write to a temporary file first so a crashed worker never leaves a partial .npz
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **{name: values[:index] for name, values in columns.items()})
+    os.replace(tmp_path, out_path)
+    return video_path, index, elapsed
+
+
+def find_videos(directory):
+    """Return the sorted video files directly inside directory."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch finger counting for recorded videos.")
+    parser.add_argument('video_dir', help="Directory containing the video files")
+    parser.add_argument('--out', default=None, help="Output directory (default: video_dir)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--confidence', type=float, default=0.7, help="Detection confidence")
+    parser.add_argument('--max-hands', type=int, default=1, help="Maximum hands per frame")
+    parser.add_argument('--flip', action='store_true', help="Flip frames horizontally before detection")
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.video_dir)
+    if not videos:
+        print(f"No videos found in '{args.video_dir}'.")
+        return 1
+    out_dir = args.out or args.video_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"Annotating {len(videos)} videos with {args.workers} workers...")
+    total_frames = 0
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.confidence, args.max_hands)) as pool:
+        futures = {
+            pool.submit(annotate_video, video,
+                        os.path.join(out_dir, os.path.basename(video) + '.npz'),
+                        args.flip): video
+            for video in videos
+        }
+        for future in as_completed(futures):
+            try:
+                video, frames, elapsed = future.result()
+            except Exception as e:
+                print(f"✗ {futures[future]}: {e}")
+                failed += 1
+                continue
+            total_frames += frames
+            print(f"✓ {video}: {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} FPS)")
+    elapsed = time.perf_counter() - start
+
+    print(f"\nProcessed {total_frames} frames from {len(videos) - failed} videos in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.1f} FPS aggregate).")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+latency_trace.py - Glass-to-LED latency tracing for Gest-LED
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class LatencyTracer:
+    """
+    Records glass-to-LED latency per frame ID: capture -> detect -> decide -> ack.
+    Only frames whose count is actually sent (and acknowledged) produce a sample.
+    """
+    STAGES = ('detect', 'decide', 'ack')
+
+    def __init__(self, window=1000, max_pending=256):
+        self.pending = {}
+        self.max_pending = max_pending
+        self.samples = {stage: deque(maxlen=window) for stage in self.STAGES + ('total',)}
+        # Acks from a MultiESPSink complete frames from sender threads
+        self.lock = threading.Lock()
+
+    def start(self, frame_id, capture_ts):
+        with self.lock:
+            self.pending[frame_id] = {'capture': capture_ts}
+            # Forget the oldest frames whose ack never arrived
+            while len(self.pending) > self.max_pending:
+                self.pending.pop(next(iter(self.pending)))
+
+    def mark(self, frame_id, stage):
+        with self.lock:
+            if frame_id in self.pending:
+                self.pending[frame_id][stage] = time.perf_counter()
+
+    def drop(self, frame_id):
+        with self.lock:
+            self.pending.pop(frame_id, None)
+
+    def complete(self, frame_id):
+        """Stamp the ack, store stage latencies (ms) and return the total."""
+        ack_ts = time.perf_counter()
+        with self.lock:
+            stamps = self.pending.pop(frame_id, None)
+        if stamps is None:
+            return None
+        stamps['ack'] = ack_ts
+        prev = stamps['capture']
+        with self.lock:
+            for stage in self.STAGES:
+                ts = stamps.get(stage, prev)
+                self.samples[stage].append((ts - prev) * 1000)
+                prev = ts
+            total = (stamps['ack'] - stamps['capture']) * 1000
+            self.samples['total'].append(total)
+        return total
+
+    def percentiles(self, ps=(50, 95, 99)):
+        """Return {stage: {pXX: ms}} over the recorded window."""
+        report = {}
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+        for stage, values in samples.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            report[stage] = {f"p{p}": ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+                             for p in ps}
+        return report
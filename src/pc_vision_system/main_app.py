@@ -5,6 +5,7 @@ Date: 2023-10-27
 """
 
 import cv2
+import itertools
 import json
 import sys
 import time
@@ -12,6 +13,7 @@ import threading
 import os
 from datetime import datetime
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Robust Import Support ---
 # To enable robust imports from parent directories, add the project's 'src'
@@ -22,6 +24,9 @@ if src_path not in sys.path:
 # --- End Robust Import Support ---
 
 import vision_module
+from pipeline import DetectionPipeline, PipelineError
+from overlay import OverlayRenderer
+from latency_trace import LatencyTracer
 
 # Attempt to import the real comms module for integration,
 # but allow standalone operation if it's not found.
@@ -31,6 +36,16 @@ except ImportError:
     print("WARNING: 'comms_module' from embedded_system not found. Serial communication will be mocked.")
     comms_module = None
 
+# Capture backends selectable through config['camera']['backend']
+CAPTURE_BACKENDS = {
+    "ANY": cv2.CAP_ANY,
+    "V4L2": cv2.CAP_V4L2,
+    "FFMPEG": cv2.CAP_FFMPEG,
+    "DSHOW": cv2.CAP_DSHOW,
+    "MSMF": cv2.CAP_MSMF,
+    "GSTREAMER": cv2.CAP_GSTREAMER,
+}
+
 class GestLEDApp:
     """Main application class for Gest-LED system."""
     
@@ -42,20 +57,39 @@ class GestLEDApp:
         # Camera and vision
         self.cap = None
         self.detector = None  # This will hold the hand detector instance
+        self.pipeline = None  # Multi-process detection, see config['pipeline']
         self.current_finger_count = 0
         self.last_counts = deque(maxlen=self.config['vision']['smoothing_frames'])
         
         # Serial hardware
         self.hardware_connected = False
         self.serial_conn = None # This would be the comms_module object later
+        self.esp_object = None
+        self.send_failures = 0  # consecutive failed commands on esp_object
+        self.sink = None  # MultiESPSink when config['serial']['multi_device'] is set
+        self.last_sent_count = -1
+
+        # Idle mode, see config['idle']
+        self.idle = False
+        self.idle_tick = 0.0  # end of the last idle iteration, for pacing
+        self.last_hand_time = time.time()
+        self.motion_ref = None
         
         # UI and performance
         self.window_name = self.config['ui']['window_name']
+        self.overlay = OverlayRenderer(self.config['ui']['colors']['text'],
+                                       self.config['ui']['colors']['error'],
+                                       self.config['ui']['colors'].get('background', (50, 50, 50)))
         self.status = "Initializing..."
         self.error_message = None
         self.fps = 0
         self.frame_count = 0
         self.fps_start_time = time.time()
+
+        # End-to-end latency tracing
+        self.next_frame_id = 0
+        self.last_capture_ts = None
+        self.tracer = LatencyTracer()
         
     def load_config(self, config_path):
         """Load configuration from JSON file. If not found, create a default."""
@@ -66,41 +100,186 @@ class GestLEDApp:
             print(f"Warning: '{config_path}' not found. Creating default config.")
             default_config = {
                 "application": {"name": "Gest-LED Controller", "version": "1.0", "debug_mode": False},
-                "serial": {"port": "auto", "baud_rate": 115200, "timeout": 2, "retry_attempts": 3},
-                "camera": {"index": 0, "width": 640, "height": 480, "fps": 30, "flip_horizontal": True},
+                "serial": {"port": "auto", "baud_rate": 115200, "timeout": 2, "retry_attempts": 3, "stats_file": None, "stats_interval": 10,
+                           "multi_device": False},
+                "camera": {"index": 0, "width": 640, "height": 480, "fps": 30, "flip_horizontal": True,
+                           "backend": "any", "fourcc": "MJPG", "buffer_size": 1, "grab_retrieve": True,
+                           "probe_indices": [0, 1, 2, 3], "probe_backends": ["any", "v4l2", "ffmpeg"]},
                 "vision": {"detection_confidence": 0.7, "max_hands": 1, "smoothing_frames": 3},
+                "pipeline": {"enabled": False, "workers": 3, "max_in_flight": 4},
+                "idle": {"enabled": True, "timeout_s": 10, "idle_fps": 5, "motion_width": 80,
+                         "motion_threshold": 25, "motion_fraction": 0.01},
                 "ui": {"window_name": "Gest-LED Controller", "font_scale": 1.0, "colors": {"text": [0, 255, 0], "error": [0, 0, 255], "background": [50, 50, 50]}}
             }
             with open(config_path, 'w') as f:
                 json.dump(default_config, f, indent=4)
             return default_config
 
+    def _open_capture(self, index):
+        """Open a VideoCapture on the configured backend. Returns None on failure."""
+        backend_name = self.config['camera'].get('backend', 'any').upper()
+        backend = CAPTURE_BACKENDS.get(backend_name, cv2.CAP_ANY)
+        cap = cv2.VideoCapture(index, backend)
+        if cap.isOpened():
+            return cap
+        cap.release()
+        return None
+
+    def _apply_capture_settings(self, cap):
+        """Apply FOURCC, buffer size and resolution/fps settings to an open capture."""
+        cam_cfg = self.config['camera']
+        # FOURCC has to be set before the resolution on most V4L2 drivers,
+        # otherwise the driver may pick a raw format that cannot reach the fps.
+        fourcc = cam_cfg.get('fourcc')
+        if fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, cam_cfg['width'])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cam_cfg['height'])
+        cap.set(cv2.CAP_PROP_FPS, cam_cfg['fps'])
+        buffer_size = cam_cfg.get('buffer_size')
+        if buffer_size:
+            # A one-frame buffer keeps us from reading stale queued frames
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
     def initialize_camera(self):
-        """Initialize webcam, trying multiple indices if the primary fails."""
+        """Initialize webcam, probing fallback indices in parallel if the primary fails."""
         primary_index = self.config['camera']['index']
-        
+
         # Try primary camera index first
-        self.cap = cv2.VideoCapture(primary_index)
-        if self.cap.isOpened():
+        self.cap = self._open_capture(primary_index)
+        if self.cap is not None:
             print(f"Camera found at index {primary_index}")
         else:
-            # If primary fails, try indices 0 to 3
-            print(f"Camera at index {primary_index} failed. Scanning other indices...")
-            for i in range(4):
-                self.cap = cv2.VideoCapture(i)
-                if self.cap.isOpened():
+            # If primary fails, open all fallback indices at once and keep the lowest one
+            candidates = [i for i in self.config['camera'].get('probe_indices', [0, 1, 2, 3])
+                          if i != primary_index]
+            print(f"Camera at index {primary_index} failed. Scanning indices {candidates}...")
+            with ThreadPoolExecutor(max_workers=max(len(candidates), 1)) as pool:
+                opened = list(pool.map(self._open_capture, candidates))
+            for i, cap in zip(candidates, opened):
+                if cap is None:
+                    continue
+                if self.cap is None:
                     print(f"Found camera at fallback index {i}")
                     self.config['camera']['index'] = i
-                    break
-            if not self.cap.isOpened():
+                    self.cap = cap
+                else:
+                    cap.release()
+            if self.cap is None:
                 self.handle_errors("fatal", "No camera found. Please check connection.")
                 return False
 
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config['camera']['width'])
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config['camera']['height'])
-        self.cap.set(cv2.CAP_PROP_FPS, self.config['camera']['fps'])
+        self._apply_capture_settings(self.cap)
         return True
 
+    def read_frame(self):
+        """
+        Read one frame from the camera. With 'grab_retrieve' enabled the frame
+        is grabbed first (cheap, timestamps the exposure) and decoded afterwards.
+        """
+        if self.config['camera'].get('grab_retrieve', False):
+            if not self.cap.grab():
+                return False, None
+            self.last_capture_ts = time.perf_counter()
+            return self.cap.retrieve()
+        ret, frame = self.cap.read()
+        self.last_capture_ts = time.perf_counter()
+        return ret, frame
+
+    def probe_capture(self, num_frames=60, work_ms=40):
+        """
+        Measure what the configured capture settings actually achieve while the
+        loop is busy for work_ms per frame (roughly one detector pass), so that
+        frames queued in the driver show up as stale. Returns a dict of results.
+
+        frame_age is the time from the driver's buffer timestamp to the moment
+        the frame reaches the app. Only V4L2 stamps buffers with the monotonic
+        clock; on other backends the age is reported as n/a.
+        """
+        if self.cap is None and not self.initialize_camera():
+            return None
+
+        # Discard the first few frames, drivers often deliver them slowly
+        for _ in range(5):
+            self.read_frame()
+
+        use_timestamps = self.cap.getBackendName().upper() == "V4L2"
+        read_ms, ages = [], []
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            time.sleep(work_ms / 1000)  # stand-in for detection
+            t0 = time.perf_counter()
+            ret, _ = self.read_frame()
+            if not ret:
+                break
+            read_ms.append((time.perf_counter() - t0) * 1000)
+            if use_timestamps:
+                age = time.monotonic() * 1000 - self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                if 0 <= age < 10000:  # ignore timestamps from another clock
+                    ages.append(age)
+        elapsed = time.perf_counter() - start
+
+        if not read_ms:
+            return None
+
+        def pct(values, p):
+            values = sorted(values)
+            return values[min(int(len(values) * p / 100), len(values) - 1)] if values else "n/a"
+
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        cam_cfg = self.config['camera']
+        result = {
+            "backend": self.cap.getBackendName(),
+            "requested_fourcc": cam_cfg.get('fourcc') or "default",
+            "buffer_size": cam_cfg.get('buffer_size') or "default",
+            "grab_retrieve": cam_cfg.get('grab_retrieve', False),
+            "fourcc": "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)),
+            "resolution": (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+            "frames": len(read_ms),
+            "fps": len(read_ms) / elapsed,
+            "read_ms_p50": pct(read_ms, 50),
+            "frame_age_ms_p50": pct(ages, 50),
+            "frame_age_ms_p95": pct(ages, 95),
+        }
+        print("Capture probe: " + ", ".join(
+            f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+        return result
+
+    def probe_capture_options(self, num_frames=60):
+        """
+        Run probe_capture for every combination of backend, MJPG on/off,
+        buffer size 1/driver default and grab/retrieve on/off, printing one line
+        per combination. The camera config is restored afterwards.
+        """
+        cam_cfg = self.config['camera']
+        saved = dict(cam_cfg)
+        results = []
+        unavailable = set()
+        options = itertools.product(cam_cfg.get('probe_backends', ['any', 'v4l2', 'ffmpeg']),
+                                    ('MJPG', None), (1, None), (True, False))
+        try:
+            for backend, fourcc, buffer_size, grab_retrieve in options:
+                if backend in unavailable:
+                    continue
+                cam_cfg.update(backend=backend, fourcc=fourcc,
+                               buffer_size=buffer_size, grab_retrieve=grab_retrieve)
+                self.cap = self._open_capture(cam_cfg['index'])
+                if self.cap is None:
+                    print(f"Capture probe: backend={backend} could not open index {cam_cfg['index']}")
+                    unavailable.add(backend)
+                    continue
+                self._apply_capture_settings(self.cap)
+                result = self.probe_capture(num_frames)
+                self.cap.release()
+                self.cap = None
+                if result:
+                    results.append(result)
+        finally:
+            cam_cfg.clear()
+            cam_cfg.update(saved)
+        return results
+
     def initialize_vision(self):
         """Initializes the hand detector from the vision module."""
         try:
@@ -137,41 +316,48 @@ class GestLEDApp:
             self.hardware_connected = False
             print("INFO: Skipping hardware initialization for standalone mode.")
 
+    def initialize_multi_serial(self):
+        """Handshake every matching board and mirror counts onto all of them."""
+        if not comms_module:
+            self.initialize_serial()
+            return
+        connections = comms_module.find_esp_ports(self.config['serial']['baud_rate'])
+        if not connections:
+            self.handle_errors("warning", "Hardware not found. Running in demo mode.")
+            return
+        # The first board to acknowledge a frame completes its latency trace
+        self.sink = comms_module.MultiESPSink(
+            connections,
+            max_failures=self.config['serial'].get('retry_attempts', 3),
+            on_ack=lambda port, count, tag: self.tracer.complete(tag),
+        )
+        for conn in connections:
+            self.start_link_stats(conn, per_port=True)
+        self.hardware_connected = True
+        self.status = "Hardware Connected"
+        print(f"Mirroring counts to {len(connections)} boards: "
+              f"{', '.join(conn.port for conn in connections)}")
+
     def create_gui_window(self):
         """Create and configure the OpenCV window."""
         cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE)
 
     def draw_ui_elements(self, frame, finger_count, fps, status):
         """Draw UI overlay on the video frame."""
-        h, w, _ = frame.shape
-        ui_color = self.config['ui']['colors']['text']
-        err_color = self.config['ui']['colors']['error']
-
-        # Status bar
-        cv2.rectangle(frame, (0, h - 20), (w, h), (50, 50, 50), -1)
-        cv2.putText(frame, f"Status: {status}", (10, h - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, ui_color, 1)
-
-        # FPS counter
-        cv2.putText(frame, f"FPS: {fps:.1f}", (w - 110, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, ui_color, 2)
-        
-        # Finger count
-        cv2.putText(frame, f"Fingers: {finger_count}", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, ui_color, 2)
+        return self.overlay.draw(frame, finger_count, fps, status, self.error_message)
 
-        # Quit instructions
-        cv2.putText(frame, "Press 'q' to quit", (w - 160, h - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, ui_color, 1)
-
-        if self.error_message:
-            cv2.putText(frame, self.error_message, (10, h // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.8, err_color, 2)
-
-        return frame
-
-    def process_frame(self, frame):
+    def process_frame(self, frame, frame_id=None):
         """Process a single frame to detect hands, count fingers, and apply smoothing."""
         # Use the detector to find hands in the frame
         hands, processed_frame = vision_module.process_frame(frame, self.detector)
-        
+        self.tracer.mark(frame_id, 'detect')
+        return processed_frame, self.update_count(hands, frame_id)
+
+    def update_count(self, hands, frame_id=None):
+        """Count fingers on the first detected hand and return the smoothed count."""
         count = 0
         if hands:
+            self.last_hand_time = time.time()
             # Process the first detected hand
             try:
                 count = vision_module.count_fingers(hands[0])
@@ -188,15 +374,18 @@ class GestLEDApp:
             smoothed_count = max(set(self.last_counts), key=self.last_counts.count)
         else:
             smoothed_count = 0
+        self.tracer.mark(frame_id, 'decide')
             
-        return processed_frame, smoothed_count
+        return smoothed_count
 
-    def send_to_hardware(self, finger_count):
+    def send_to_hardware(self, finger_count, frame_id=None):
         """Send finger count to ESP8266 using the comms_module."""
         if self.hardware_connected and self.serial_conn:
             try:
-                success = comms_module.send_command(self.serial_conn, f"C{finger_count}")
-                if not success:
+                success = comms_module.send_command(self.serial_conn, finger_count, tag=frame_id)
+                if success:
+                    self.tracer.complete(frame_id)
+                else:
                     # Implement retry logic or connection reset if needed
                     self.handle_errors("warning", "Command to hardware failed.")
             except Exception as e:
@@ -223,11 +412,128 @@ class GestLEDApp:
         if error_type == "fatal":
             self.running = False
 
-    #Change Here#
-    esp_port = comms_module.find_esp_port()
-    esp_object = comms_module.initialize_connection(esp_port)
-    #############
+    def initialize_pipeline(self, frame_shape):
+        """Start the multi-process detection pipeline for frames of the given shape."""
+        pipe_cfg = self.config['pipeline']
+        self.pipeline = DetectionPipeline(
+            frame_shape,
+            num_workers=pipe_cfg['workers'],
+            max_in_flight=pipe_cfg['max_in_flight'],
+            detection_confidence=self.config['vision']['detection_confidence'],
+            max_hands=self.config['vision']['max_hands'],
+        )
+        # Each worker loads its own model, which can take several seconds
+        self.pipeline.wait_ready()
+        print(f"Detection pipeline started: {pipe_cfg['workers']} workers, "
+              f"{pipe_cfg['max_in_flight']} frames in flight.")
+
+    def handle_result(self, processed_frame, finger_count, frame_id):
+        """Send, draw and display one processed frame."""
+        self.current_finger_count = finger_count
+
+        # Only send data if the count has changed
+        awaiting_ack = False
+        if self.current_finger_count != self.last_sent_count:
+            if self.sink:
+                # Acks arrive asynchronously and complete the trace via on_ack
+                awaiting_ack = self.sink.send(self.current_finger_count, tag=frame_id) > 0
+            elif comms_module:
+                if comms_module.send_command(self.esp_object, self.current_finger_count, tag=frame_id):
+                    self.tracer.complete(frame_id)
+                    self.send_failures = 0
+                else:
+                    self.handle_send_failure()
+            elif self.config['application']['debug_mode']:
+                print(f"Debug: Would send command 'C{self.current_finger_count}' to hardware.")
+            self.last_sent_count = self.current_finger_count
+        if not awaiting_ack:
+            self.tracer.drop(frame_id)
+
+        # Update UI elements
+        current_fps = self.calculate_fps()
+        status_text = "Hardware Connected" if self.hardware_connected else "Demo Mode"
+        if self.idle:
+            status_text += " (Idle)"
+        ui_frame = self.draw_ui_elements(processed_frame, self.current_finger_count, current_fps, status_text)
+
+        cv2.imshow(self.window_name, ui_frame)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            print("'q' pressed. Shutting down.")
+            self.running = False
 
+    def detect_motion(self, frame):
+        """
+        Cheap motion check for idle mode: compare a small grayscale copy of the
+        frame with the previous one and report whether enough pixels changed.
+        """
+        idle_cfg = self.config['idle']
+        h, w = frame.shape[:2]
+        small_w = idle_cfg['motion_width']
+        small = cv2.resize(frame, (small_w, max(1, h * small_w // w)), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        previous, self.motion_ref = self.motion_ref, small
+        if previous is None:
+            return False
+        changed = cv2.countNonZero(cv2.threshold(cv2.absdiff(small, previous),
+                                                 idle_cfg['motion_threshold'], 255,
+                                                 cv2.THRESH_BINARY)[1])
+        return changed > idle_cfg['motion_fraction'] * small.size
+
+    def enter_idle(self):
+        """Stop running the hand detector and drop the camera to the idle frame rate."""
+        print("No hand seen for a while. Entering idle mode.")
+        if self.pipeline:
+            # Finish the frames already in flight before going quiet
+            while self.pipeline.in_flight():
+                self.handle_pipeline_result(self.pipeline.get())
+        self.idle = True
+        self.idle_tick = time.perf_counter()
+        self.motion_ref = None
+        self.cap.set(cv2.CAP_PROP_FPS, self.config['idle']['idle_fps'])
+
+    def exit_idle(self):
+        """Restore the full capture rate and resume detection."""
+        print("Motion detected. Leaving idle mode.")
+        self.idle = False
+        self.last_hand_time = time.time()
+        self.cap.set(cv2.CAP_PROP_FPS, self.config['camera']['fps'])
+
+    def start_link_stats(self, serial_conn, per_port=False):
+        """
+        Start the periodic link stats dump for a connection carrying commands.
+        With per_port the port goes into the file name, e.g. link_stats.json
+        becomes link_stats_ttyUSB0.json, so every board gets its own file.
+        """
+        stats_file = self.config['serial'].get('stats_file')
+        if serial_conn is None or not stats_file:
+            return
+        if per_port:
+            root, ext = os.path.splitext(stats_file)
+            port_name = "".join(c if c.isalnum() else "_" for c in os.path.basename(serial_conn.port))
+            stats_file = f"{root}_{port_name}{ext}"
+        # reconnect() carries the same LinkStats over, so the dump follows the board
+        comms_module.get_link_stats(serial_conn).start_periodic_dump(
+            stats_file, self.config['serial'].get('stats_interval', 10))
+
+    def handle_send_failure(self):
+        """Reconnect the board after too many failed commands in a row."""
+        if self.esp_object is None:
+            return
+        self.send_failures += 1
+        if self.send_failures < self.config['serial'].get('retry_attempts', 3):
+            return
+        print(f"{self.send_failures} commands failed in a row. Reconnecting to {self.esp_object.port}...")
+        self.send_failures = 0
+        # reconnect() keeps the link stats; on failure keep the old object to retry later
+        self.esp_object = comms_module.reconnect(self.esp_object) or self.esp_object
+
+    def handle_pipeline_result(self, result):
+        frame_id, hands, processed_frame = result
+        self.tracer.mark(frame_id, 'detect')
+        self.handle_result(processed_frame, self.update_count(hands, frame_id), frame_id)
 
     def run(self):
         """Main application loop."""
@@ -237,14 +543,27 @@ class GestLEDApp:
         if not self.initialize_vision():
             return # Exit if vision module fails to load
 
-        self.initialize_serial()
+        if self.config['serial'].get('multi_device', False):
+            self.initialize_multi_serial()
+        else:
+            if comms_module:
+                #Change Here#
+                esp_port = comms_module.find_esp_port()
+                self.esp_object = comms_module.initialize_connection(esp_port)
+                #############
+                self.start_link_stats(self.esp_object)
+
+            self.initialize_serial()
         self.create_gui_window()
 
-        last_sent_count = -1
+        self.last_sent_count = -1
+        use_pipeline = self.config.get('pipeline', {}).get('enabled', False)
+        idle_cfg = self.config.get('idle', {})
+        self.last_hand_time = time.time()
 
         while self.running:
             try:
-                ret, frame = self.cap.read()
+                ret, frame = self.read_frame()
                 if not ret:
                     self.handle_errors("fatal", "Failed to grab frame from camera.")
                     break
@@ -252,25 +571,49 @@ class GestLEDApp:
                 if self.config['camera']['flip_horizontal']:
                     frame = cv2.flip(frame, 1)
 
-                processed_frame, finger_count = self.process_frame(frame.copy())
-                self.current_finger_count = finger_count
-                
-                # Only send data if the count has changed
-                if self.current_finger_count != last_sent_count:
-                    comms_module.send_command(self.esp_object,self.current_finger_count)
-                    last_sent_count = self.current_finger_count
-
-                # Update UI elements
-                current_fps = self.calculate_fps()
-                status_text = "Hardware Connected" if self.hardware_connected else "Demo Mode"
-                ui_frame = self.draw_ui_elements(processed_frame, self.current_finger_count, current_fps, status_text)
-
-                cv2.imshow(self.window_name, ui_frame)
-
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    print("'q' pressed. Shutting down.")
-                    self.running = False
+                frame_id = self.next_frame_id
+                self.next_frame_id += 1
+
+                if self.idle:
+                    if not self.detect_motion(frame):
+                        # Show the frame without detection. If the driver ignored the
+                        # lower fps request, sleep out the rest of the idle period;
+                        # a driver that honours it has already spent that time in read.
+                        self.handle_result(frame, self.current_finger_count, frame_id)
+                        remaining = self.idle_tick + 1 / idle_cfg['idle_fps'] - time.perf_counter()
+                        if remaining > 0:
+                            time.sleep(remaining)
+                        self.idle_tick = time.perf_counter()
+                        continue
+                    self.exit_idle()
+                elif idle_cfg.get('enabled', False) and \
+                        time.time() - self.last_hand_time > idle_cfg['timeout_s']:
+                    self.enter_idle()
+                    continue
+
+                self.tracer.start(frame_id, self.last_capture_ts)
+
+                if use_pipeline:
+                    try:
+                        if self.pipeline is None:
+                            self.initialize_pipeline(frame.shape)
+                        # Block for the oldest result only when every slot is busy,
+                        # then hand back whatever else is already finished, in order.
+                        while not self.pipeline.submit(frame, frame_id):
+                            self.handle_pipeline_result(self.pipeline.get())
+                        result = self.pipeline.get(block=False)
+                        while result is not None and self.running:
+                            self.handle_pipeline_result(result)
+                            result = self.pipeline.get(block=False)
+                    except PipelineError as e:
+                        self.handle_errors("warning", f"{e} Falling back to single-process detection.")
+                        if self.pipeline:
+                            self.pipeline.close()
+                            self.pipeline = None
+                        use_pipeline = False
+                else:
+                    processed_frame, finger_count = self.process_frame(frame.copy(), frame_id)
+                    self.handle_result(processed_frame, finger_count, frame_id)
 
             except Exception as e:
                 self.handle_errors("runtime", f"An error occurred: {e}")
@@ -281,8 +624,25 @@ class GestLEDApp:
     def cleanup(self):
         """Cleanly shut down all resources."""
         print("Cleaning up resources...")
+        for stage, pct in self.tracer.percentiles().items():
+            print(f"Latency {stage}: " + ", ".join(f"{k}={v:.1f} ms" for k, v in pct.items()))
+        if self.pipeline:
+            self.pipeline.close()
+            self.pipeline = None
         if self.cap:
             self.cap.release()
+        if self.sink:
+            for board in self.sink.boards:
+                comms_module.get_link_stats(board.conn).stop_periodic_dump()
+            for board in self.sink.status():
+                print(f"Board {board['port']}: {board}")
+            self.sink.close()
+            self.sink = None
+        if self.esp_object:
+            stats = comms_module.get_link_stats(self.esp_object)
+            stats.stop_periodic_dump()
+            print(f"Link stats: {stats.snapshot()}")
+            comms_module.close_connection(self.esp_object)
         if self.hardware_connected and self.serial_conn:
             comms_module.close_connection(self.serial_conn)
             print("Hardware connection closed.")
@@ -293,4 +653,13 @@ if __name__ == '__main__':
     # Ensure the script can find other modules in its directory
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     app = GestLEDApp()
-    app.run()
+    if '--probe-camera-all' in sys.argv:
+        # Measure every combination of capture options, then exit
+        app.probe_capture_options()
+        app.cleanup()
+    elif '--probe-camera' in sys.argv:
+        # Report what the configured capture settings actually achieve, then exit
+        app.probe_capture()
+        app.cleanup()
+    else:
+        app.run()
@@ -0,0 +1,90 @@
+"""
+overlay.py - Cached UI overlay rendering for Gest-LED
+
+The status bar is opaque, so the bar background, the status text and the quit
+hint are rasterized once into a cached layer and re-rendered only when the
+status or the frame width changes. Each frame then restores the bar with a
+single slice copy, and only the few glyph pixels that rise above the bar onto
+the video are blended again.
+
+Text drawn over the live video (FPS, finger count, errors) has to be blended
+with new pixels every frame anyway, and a direct cv2.putText is cheaper than
+compositing a cached glyph patch, so those are still drawn directly.
+"""
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+BAR_HEIGHT = 20
+
+
+class OverlayRenderer:
+    """Draws the Gest-LED UI overlay using a cached status bar layer."""
+
+    def __init__(self, text_color, error_color, bar_color=(50, 50, 50)):
+        self.text_color = tuple(text_color)
+        self.error_color = tuple(error_color)
+        self.bar_color = tuple(bar_color)
+        self._bar = None
+        self._bar_texts = []
+        self._spill_rows = 0
+        self._spill_pixels = None
+        self._spill_alpha = None
+        self._text_rgb = np.array(text_color, dtype=np.float32)
+        self._bar_key = None  # (width, status) the cached bar was rendered for
+
+    def _render_bar(self, w, status):
+        """Rasterize the opaque status bar with its status text and quit hint."""
+        self._bar_texts = [(f"Status: {status}", 10), ("Press 'q' to quit", w - 160)]
+        text_h = max(cv2.getTextSize(text, FONT, 0.6, 1)[0][1] for text, _ in self._bar_texts)
+        # Rows of video above the bar that the tallest glyphs reach into
+        self._spill_rows = max(text_h + 1 - 10, 0)
+
+        rows = self._spill_rows + BAR_HEIGHT
+        layer = np.empty((rows, w, 3), dtype=np.uint8)
+        layer[:] = self.bar_color
+        coverage = np.zeros((rows, w), dtype=np.uint8)
+        for text, x in self._bar_texts:
+            cv2.putText(layer, text, (x, rows - 10), FONT, 0.6, self.text_color, 1)
+            cv2.putText(coverage, text, (x, rows - 10), FONT, 0.6, 255, 1)
+        self._bar = layer[self._spill_rows:]
+
+        # The spilled glyph pixels, with their coverage for blending over video
+        ys, xs = np.nonzero(coverage[:self._spill_rows])
+        self._spill_pixels = (ys, xs)
+        self._spill_alpha = coverage[ys, xs].astype(np.float32)[:, None] / 255
+
+    def draw(self, frame, finger_count, fps, status, error_message=None):
+        """Draw the overlay onto frame in place and return it."""
+        h, w = frame.shape[:2]
+
+        # Status bar with status text and quit instructions
+        key = (w, status)
+        if key != self._bar_key:
+            self._render_bar(w, status)
+            self._bar_key = key
+        bar_top = h - BAR_HEIGHT
+        if bar_top >= self._spill_rows:
+            frame[bar_top:h] = self._bar
+            if self._spill_rows:
+                # The glyph tops above the bar sit on live video, so blend just those pixels
+                strip = frame[bar_top - self._spill_rows:bar_top]
+                under = strip[self._spill_pixels].astype(np.float32)
+                strip[self._spill_pixels] = under + (self._text_rgb - under) * self._spill_alpha + 0.5
+        else:
+            # Frame too small for the cached layout, draw the bar directly
+            cv2.rectangle(frame, (0, bar_top), (w, h), self.bar_color, -1)
+            for text, x in self._bar_texts:
+                cv2.putText(frame, text, (x, h - 10), FONT, 0.6, self.text_color, 1)
+
+        # FPS counter
+        cv2.putText(frame, f"FPS: {fps:.1f}", (w - 110, 30), FONT, 0.7, self.text_color, 2)
+
+        # Finger count
+        cv2.putText(frame, f"Fingers: {finger_count}", (10, 40), FONT, 1, self.text_color, 2)
+
+        if error_message:
+            cv2.putText(frame, error_message, (10, h // 2), FONT, 0.8, self.error_color, 2)
+
+        return frame
@@ -0,0 +1,177 @@
+"""
+pipeline.py - Multi-process hand detection pipeline for Gest-LED
+
+Several frames are kept in flight at once: each worker process owns its own
+HandDetector and works on frames placed in shared-memory slots. Results are
+handed back strictly in capture order so smoothing and sending behave exactly
+as in the single-threaded loop.
+"""
+
+import multiprocessing as mp
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class PipelineError(RuntimeError):
+    """A worker failed to start or exited, so pending results will never arrive."""
+
+
+def _detector_worker(slot_names, frame_shape, task_queue, result_queue,
+                     detection_confidence, max_hands):
+    """Worker process: detect hands in the frame held by a slot, annotate it in place."""
+    try:
+        import vision_module
+
+        detector = vision_module.initialize_detector(detection_confidence=detection_confidence,
+                                                     max_hands=max_hands)
+    except Exception as e:
+        result_queue.put((None, "error", f"{type(e).__name__}: {e}"))
+        return
+    shms = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    slots = [np.ndarray(frame_shape, dtype=np.uint8, buffer=shm.buf) for shm in shms]
+    # Loading the model can take seconds; tell the parent when we can take frames
+    result_queue.put((None, "ready", None))
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            seq, slot = task
+            try:
+                hands, img = vision_module.process_frame(slots[slot], detector)
+                if img is not None and img is not slots[slot]:
+                    slots[slot][:] = img
+            except Exception as e:
+                print(f"Pipeline worker error: {e}")
+                hands = []
+            result_queue.put((seq, slot, hands))
+    finally:
+        del slots
+        for shm in shms:
+            shm.close()
+
+
+class DetectionPipeline:
+    """Detection across a pool of worker processes with ordered reassembly."""
+
+    def __init__(self, frame_shape, num_workers=2, max_in_flight=4,
+                 detection_confidence=0.7, max_hands=1, poll_interval=0.5):
+        self.frame_shape = tuple(frame_shape)
+        self.poll_interval = poll_interval
+        nbytes = int(np.prod(self.frame_shape))
+
+        # One shared-memory slot per in-flight frame bounds the added latency
+        self.shms = [shared_memory.SharedMemory(create=True, size=nbytes)
+                     for _ in range(max_in_flight)]
+        self.slots = [np.ndarray(self.frame_shape, dtype=np.uint8, buffer=shm.buf)
+                      for shm in self.shms]
+        self.free_slots = deque(range(max_in_flight))
+
+        ctx = mp.get_context("spawn")
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        self.workers = [
+            ctx.Process(target=_detector_worker, daemon=True,
+                        args=([shm.name for shm in self.shms], self.frame_shape,
+                              self.task_queue, self.result_queue,
+                              detection_confidence, max_hands))
+            for _ in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        self.next_seq = 0      # sequence number of the next submitted frame
+        self.next_out = 0      # sequence number of the next result to hand back
+        self.frame_ids = {}    # seq -> caller's frame id
+        self.ready = {}        # seq -> (slot, hands), finished but out of order
+        self.ready_workers = 0
+
+    def _check_workers(self):
+        dead = [w.pid for w in self.workers if not w.is_alive()]
+        if dead:
+            raise PipelineError(f"Detection pipeline worker(s) {dead} exited.")
+
+    def _receive(self, block):
+        """Take one message off the result queue; control messages are handled here."""
+        while True:
+            try:
+                if block:
+                    seq, slot, hands = self.result_queue.get(timeout=self.poll_interval)
+                else:
+                    seq, slot, hands = self.result_queue.get_nowait()
+            except queue.Empty:
+                # No fixed deadline: keep waiting as long as every worker is alive
+                self._check_workers()
+                if block:
+                    continue
+                return False
+            if seq is None:
+                if slot == "error":
+                    raise PipelineError(f"Detection pipeline worker failed to start: {hands}")
+                self.ready_workers += 1
+                continue
+            self.ready[seq] = (slot, hands)
+            return True
+
+    def wait_ready(self):
+        """Block until every worker has loaded its detector."""
+        while self.ready_workers < len(self.workers):
+            try:
+                seq, slot, message = self.result_queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if slot == "error":
+                raise PipelineError(f"Detection pipeline worker failed to start: {message}")
+            self.ready_workers += 1
+
+    def in_flight(self):
+        return self.next_seq - self.next_out
+
+    def submit(self, frame, frame_id):
+        """Queue a frame for detection. Returns False if every slot is busy."""
+        if not self.free_slots:
+            return False
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match pipeline {self.frame_shape}")
+        slot = self.free_slots.popleft()
+        self.slots[slot][:] = frame
+        self.frame_ids[self.next_seq] = frame_id
+        self.task_queue.put((self.next_seq, slot))
+        self.next_seq += 1
+        return True
+
+    def get(self, block=True):
+        """
+        Return the next result in capture order as (frame_id, hands, annotated_frame),
+        or None if it is not ready yet and block is False.
+        """
+        if self.in_flight() == 0:
+            return None
+        while self.next_out not in self.ready:
+            if not self._receive(block):
+                return None
+
+        slot, hands = self.ready.pop(self.next_out)
+        frame_id = self.frame_ids.pop(self.next_out)
+        annotated = self.slots[slot].copy()
+        self.free_slots.append(slot)
+        self.next_out += 1
+        return frame_id, hands, annotated
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=2)
+            if worker.is_alive():
+                worker.terminate()
+        del self.slots
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
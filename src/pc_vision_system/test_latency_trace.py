@@ -0,0 +1,60 @@
+"""
+test_latency_trace.py - Tests for end-to-end latency tracing
+"""
+
+import time
+
+from latency_trace import LatencyTracer
+
+
+def test_complete_records_every_stage():
+    tracer = LatencyTracer()
+    tracer.start(1, time.perf_counter())
+    tracer.mark(1, 'detect')
+    tracer.mark(1, 'decide')
+    total = tracer.complete(1)
+    assert total is not None and total >= 0
+    for stage in LatencyTracer.STAGES + ('total',):
+        assert len(tracer.samples[stage]) == 1
+    # Stage latencies add up to the total
+    stage_sum = sum(tracer.samples[stage][0] for stage in LatencyTracer.STAGES)
+    assert abs(stage_sum - total) < 1e-6
+    assert 1 not in tracer.pending
+    print("✓ Complete test passed")
+
+
+def test_complete_unknown_or_dropped_frame():
+    tracer = LatencyTracer()
+    assert tracer.complete(99) is None
+    tracer.start(1, time.perf_counter())
+    tracer.drop(1)
+    assert tracer.complete(1) is None
+    assert not tracer.samples['total']
+    print("✓ Drop test passed")
+
+
+def test_pending_is_bounded():
+    tracer = LatencyTracer(max_pending=3)
+    for frame_id in range(5):
+        tracer.start(frame_id, time.perf_counter())
+    assert list(tracer.pending) == [2, 3, 4]
+    assert tracer.complete(0) is None
+    print("✓ Pending bound test passed")
+
+
+def test_percentiles():
+    tracer = LatencyTracer()
+    assert tracer.percentiles() == {}
+    tracer.samples['total'].extend(range(1, 101))
+    report = tracer.percentiles()
+    assert list(report) == ['total']
+    assert report['total'] == {'p50': 51, 'p95': 96, 'p99': 100}
+    print("✓ Percentiles test passed")
+
+
+if __name__ == "__main__":
+    test_complete_records_every_stage()
+    test_complete_unknown_or_dropped_frame()
+    test_pending_is_bounded()
+    test_percentiles()
+    print("\nAll latency trace tests passed!")
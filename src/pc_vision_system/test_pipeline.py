@@ -0,0 +1,123 @@
+"""
+test_pipeline.py - Tests for the multi-process detection pipeline
+
+Workers are spawned with a stub vision_module (written to a temporary
+directory placed first on sys.path), so no camera or model is needed.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from pipeline import DetectionPipeline, PipelineError
+
+STUB_VISION_MODULE = '''
+import os, random, time
+
+def initialize_detector(detection_confidence=0.7, max_hands=1):
+    if os.environ.get("STUB_FAIL_INIT"):
+        raise ImportError("stub detector unavailable")
+    return None
+
+def process_frame(frame, detector, draw=True):
+    frame_no = int(frame[0, 0, 1])
+    if frame_no == int(os.environ.get("STUB_DIE_ON", "-1")):
+        os._exit(1)
+    time.sleep(random.random() * 0.02)  # finish out of order
+    frame[0, 0, 0] = frame_no + 1       # "annotate" in place
+    return [{"frame_no": frame_no}], frame
+'''
+
+FRAME_SHAPE = (4, 4, 3)
+
+
+def _with_stub_detector(test, **env):
+    """Run test() with the stub vision_module importable by spawned workers."""
+    with tempfile.TemporaryDirectory() as stub_dir:
+        with open(os.path.join(stub_dir, "vision_module.py"), "w") as f:
+            f.write(STUB_VISION_MODULE)
+        sys.path.insert(0, stub_dir)
+        os.environ.update(env)
+        try:
+            test()
+        finally:
+            sys.path.remove(stub_dir)
+            for key in env:
+                del os.environ[key]
+
+
+def _frame(frame_no):
+    frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    frame[0, 0, 1] = frame_no
+    return frame
+
+
+def _run_frames(pipeline, count):
+    results = []
+    for frame_no in range(count):
+        while not pipeline.submit(_frame(frame_no), frame_no):
+            results.append(pipeline.get())
+        result = pipeline.get(block=False)
+        while result is not None:
+            results.append(result)
+            result = pipeline.get(block=False)
+    while pipeline.in_flight():
+        results.append(pipeline.get())
+    return results
+
+
+def test_results_in_capture_order():
+    def check():
+        pipeline = DetectionPipeline(FRAME_SHAPE, num_workers=3, max_in_flight=4)
+        try:
+            pipeline.wait_ready()
+            results = _run_frames(pipeline, 40)
+        finally:
+            pipeline.close()
+        assert [frame_id for frame_id, _, _ in results] == list(range(40))
+        for frame_id, hands, annotated in results:
+            assert hands == [{"frame_no": frame_id}]
+            assert annotated[0, 0, 0] == frame_id + 1
+    _with_stub_detector(check)
+    print("✓ Ordered reassembly test passed")
+
+
+def test_dead_worker_raises():
+    def check():
+        pipeline = DetectionPipeline(FRAME_SHAPE, num_workers=2, max_in_flight=4, poll_interval=0.1)
+        try:
+            pipeline.wait_ready()
+            try:
+                _run_frames(pipeline, 20)
+            except PipelineError:
+                pass
+            else:
+                raise AssertionError("expected PipelineError after a worker exited")
+        finally:
+            pipeline.close()
+    _with_stub_detector(check, STUB_DIE_ON="7")
+    print("✓ Dead worker test passed")
+
+
+def test_worker_start_failure_raises():
+    def check():
+        pipeline = DetectionPipeline(FRAME_SHAPE, num_workers=1, max_in_flight=2, poll_interval=0.1)
+        try:
+            pipeline.wait_ready()
+        except PipelineError as e:
+            assert "stub detector unavailable" in str(e)
+        else:
+            raise AssertionError("expected PipelineError when the detector cannot load")
+        finally:
+            pipeline.close()
+    _with_stub_detector(check, STUB_FAIL_INIT="1")
+    print("✓ Worker start failure test passed")
+
+
+if __name__ == "__main__":
+    test_results_in_capture_order()
+    test_dead_worker_raises()
+    test_worker_start_failure_raises()
+    print("\nAll pipeline tests passed!")
@@ -38,15 +38,19 @@ def initialize_detector(detection_confidence=0.7, max_hands=1):
     """
     return HandDetector(detectionCon=detection_confidence, maxHands=max_hands)
 
-def process_frame(frame, detector):
+def process_frame(frame, detector, draw=True):
     """
-    Process a single frame to detect hands and draw landmarks.
+    Process a single frame to detect hands and, optionally, draw landmarks.
     """
     if frame is None:
         return [], frame
 
-    hands, img = detector.findHands(frame, draw=True)
-    return hands, img
+    result = detector.findHands(frame, draw=draw)
+    # Depending on the cvzone release, draw=False returns either just the
+    # hands list or the usual (hands, img) tuple
+    if isinstance(result, tuple):
+        return result
+    return result, frame
 
 def validate_hand_data(hand_data):
     """